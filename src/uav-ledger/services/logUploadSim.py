@@ -3,6 +3,8 @@ import sys
 import argparse
 from pathlib import Path
 
+import numpy as np
+
 # --- Bootstrap Django settings so we can import from storage.s3_client --- 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]  # repo root (uav-ledger/)
 sys.path.insert(0, str(PROJECT_ROOT))
@@ -12,24 +14,35 @@ import django
 django.setup()
 
 from django.conf import settings 
-from storage.s3_client import s3_client, flight_key
+from storage.s3_client import s3_client, flight_key, upload_flight_log
 from typing import Optional
-import hashlib
 from services.uav_registry_client import (
-    register_flight_on_chain,
-    add_checkpoint_on_chain,
-    close_flight_on_chain,
+    sign_register_flight_tx,
+    sign_checkpoint_tx,
+    sign_checkpoints_batch_tx,
+    sign_close_flight_tx,
+    send_raw_transactions_batch,
+    wait_all,
+    MAX_CHECKPOINTS_PER_BATCH,
 )
-from services.eth_client import w3
+from services.eth_client import w3, ACCOUNT_ADDRESS
+from services.rolling_hash import RollingHash
 
-def read_log_bytes_by_lines(path: Path):
+def read_log_bytes_with_line_offsets(path: Path):
     """
-    Read the file as raw bytes and split into lines while preserving line endings.
-    This ensures we do not alter the bytes that will be uploaded (important later for hashing).
+    Read the file as raw bytes once and record where each line ends.
+    Returns (data, line_end_offsets) where line_end_offsets[i] is the
+    end-exclusive byte offset of line i (line endings are kept with their line).
+    The bytes themselves are never split or re-joined, so what we upload and
+    hash is exactly what is on disk.
     """
     data = path.read_bytes()
-    lines = data.splitlines(keepends=True)  # preserves \n / \r\n exactly as-is
-    return lines
+    arr = np.frombuffer(data, dtype=np.uint8)
+    line_end_offsets = np.flatnonzero(arr == 0x0A) + 1
+    if len(data) > (line_end_offsets[-1] if len(line_end_offsets) else 0):
+        # trailing line without a newline terminator
+        line_end_offsets = np.append(line_end_offsets, len(data))
+    return data, line_end_offsets
 
 def chunk_plan(total_lines: int, chunks: int):
     """
@@ -37,45 +50,137 @@ def chunk_plan(total_lines: int, chunks: int):
       e.g., total_lines=100, chunks=10 -> [10, 20, 30, ... , 100]
     Ensures the last chunk includes any remainder.
     """
-    base = total_lines // chunks
-    rem = total_lines % chunks
-    out = []
-    acc = 0
-    for i in range(chunks):
-        # Distribute the remainder into the earliest chunks
-        this = base + (1 if i < rem else 0)
-        acc += this
-        out.append(acc)
-    return out
-
-# Hash Helpers
-def rolling_seed() -> bytes:
-    return b"\x00" * 32 
-
-def rolling_update(H_prev: bytes, new_bytes: bytes) -> bytes:
-    return hashlib.sha256(H_prev + new_bytes).digest()
-
-def emit_checkpoint_to_chain(flight_id: str, seq_no: int, tip_hash_hex: str):
+    base, rem = divmod(total_lines, chunks)
+    sizes = np.full(chunks, base, dtype=np.int64)
+    # Distribute the remainder into the earliest chunks
+    sizes[:rem] += 1
+    return np.cumsum(sizes).tolist()
+
+def emit_checkpoint_to_chain(
+    flight_id: str,
+    seq_no: int,
+    tip_hash_hex: str,
+    pending: list,
+    base_nonce: int,
+    gas_price: int,
+):
     """
     Ensure the flight is registered, then add a checkpoint for this upload.
     For now we just store (flightId, versionId=seq_no, hash).
+
+    Txs are only signed here; they are sent in one batch and their receipts
+    collected after the upload loop. Every signed tx is appended to `pending`
+    as (label, signed_tx), so the next free nonce is always
+    base_nonce + len(pending).
     """
     if seq_no == 1:
         # First upload ⇒ register the flight
         print(f"Registering flight {flight_id} on-chain...")
-        reg = register_flight_on_chain(flight_id)
-        print(f"  → tx={reg['transaction_hash']} status={reg['status']}")
+        signed_tx = sign_register_flight_tx(
+            flight_id,
+            nonce=base_nonce + len(pending),
+            gas_price=gas_price,
+        )
+        pending.append(("registerFlight", signed_tx))
+        print(f"  → tx={signed_tx.hash.hex()} (signed)")
 
     print(
         f"Adding checkpoint for {flight_id} seq_no={seq_no} "
         f"hash={tip_hash_hex}"
     )
-    cp = add_checkpoint_on_chain(
+    signed_tx = sign_checkpoint_tx(
         flight_id=flight_id,
-        version_id=seq_no,
+        seq_no=seq_no,
         hash_hex=tip_hash_hex,
+        nonce=base_nonce + len(pending),
+        gas_price=gas_price,
+    )
+    pending.append((f"addCheckpoint seq_no={seq_no}", signed_tx))
+    print(f"  → tx={signed_tx.hash.hex()} (signed)")
+
+
+def emit_checkpoints_batch_to_chain(
+    flight_id: str,
+    checkpoints: list,
+    pending: list,
+    base_nonce: int,
+    gas_price: int,
+):
+    """
+    Register the flight, then anchor every (seq_no, hash) collected during
+    the upload loop with addCheckpointsBatch txs of at most
+    MAX_CHECKPOINTS_PER_BATCH checkpoints each (one tx for typical flights).
+    Same `pending` / nonce bookkeeping as emit_checkpoint_to_chain.
+    """
+    print(f"Registering flight {flight_id} on-chain...")
+    signed_tx = sign_register_flight_tx(
+        flight_id,
+        nonce=base_nonce + len(pending),
+        gas_price=gas_price,
     )
-    print(f"  → tx={cp['transaction_hash']} status={cp['status']}")
+    pending.append(("registerFlight", signed_tx))
+    print(f"  → tx={signed_tx.hash.hex()} (signed)")
+
+    for start in range(0, len(checkpoints), MAX_CHECKPOINTS_PER_BATCH):
+        batch = checkpoints[start:start + MAX_CHECKPOINTS_PER_BATCH]
+        print(
+            f"Adding checkpoints seq_no={batch[0][0]}..{batch[-1][0]} "
+            f"for {flight_id} in one batch"
+        )
+        signed_tx = sign_checkpoints_batch_tx(
+            flight_id,
+            batch,
+            nonce=base_nonce + len(pending),
+            gas_price=gas_price,
+        )
+        pending.append(
+            (f"addCheckpointsBatch seq_no={batch[0][0]}..{batch[-1][0]}", signed_tx)
+        )
+        print(f"  → tx={signed_tx.hash.hex()} (signed)")
+
+
+def send_and_confirm(pending: list) -> int:
+    """
+    Send every signed (label, signed_tx) in JSON-RPC batches, then wait
+    for the receipts and print each tx's status.
+    Returns how many txs the node accepted.
+    """
+    if not pending:
+        return 0
+
+    sent = []
+    try:
+        print(f"Sending {len(pending)} tx(s) in JSON-RPC batches...")
+        results = send_raw_transactions_batch([signed_tx for _, signed_tx in pending])
+
+        # pending holds consecutive nonces, so once one tx is rejected every
+        # later one the node accepted sits behind the gap and cannot be mined
+        minable = []
+        gap_label = None
+        for (label, _), (tx_hash, error) in zip(pending, results):
+            if error is not None:
+                print(f"⚠️ {label}: tx={tx_hash.hex()} rejected by node: {error}")
+                if gap_label is None:
+                    gap_label = label
+                continue
+
+            sent.append((label, tx_hash))
+            if gap_label is None:
+                minable.append((label, tx_hash))
+            else:
+                print(f"⚠️ {label}: tx={tx_hash.hex()} stuck behind the nonce gap left by {gap_label}")
+
+        print(f"Waiting for {len(minable)} on-chain tx(s) to be mined...")
+        receipts = wait_all([tx_hash for _, tx_hash in minable])
+        for (label, tx_hash), receipt in zip(minable, receipts):
+            if receipt is None:
+                print(f"⚠️ {label}: tx={tx_hash.hex()} not mined before the timeout")
+            else:
+                print(f"  {label}: tx={tx_hash.hex()} status={receipt['status']}")
+    except Exception as e:
+        print(f"⚠️ Failed to send or confirm on-chain txs: {e}")
+
+    return len(sent)
 
 
 def simulate_uploads(
@@ -83,6 +188,7 @@ def simulate_uploads(
     flight_id: str,
     chunks: int = 10,
     bucket: Optional[str] = None,
+    batch_checkpoints: bool = False,
 ):
     bucket = bucket or settings.AWS_S3_BUCKET
     if not bucket:
@@ -95,8 +201,8 @@ def simulate_uploads(
     s3 = s3_client()
     key = flight_key(flight_id)
 
-    lines = read_log_bytes_by_lines(source_file)
-    total = len(lines)
+    data, line_end_offsets = read_log_bytes_with_line_offsets(source_file)
+    total = len(line_end_offsets)
     if total == 0:
         print("Source file appears empty—nothing to upload.")
         return
@@ -109,48 +215,98 @@ def simulate_uploads(
 
     steps = chunk_plan(total_lines=total, chunks=chunks)
 
-    H = rolling_seed()
-    prev_upto = 0
-
-    for seq_no, upto in enumerate(steps, start=1):
-        # Rolling update w/ only new bytes since last upload
-        new_segment = b"".join(lines[prev_upto:upto])  # just the delta
-        H = rolling_update(H, new_segment)
-        tip_hash_hex = "0x" + H.hex()
-
-        body = b"".join(lines[:upto])
-        s3.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=body,
-            ContentType="text/plain; charset=utf-8",
-        )
-        head = s3.head_object(Bucket=bucket, Key=key)
-        version_id = head.get("VersionId")
+    # Fetch nonce and gas price once; txs are signed during the uploads and
+    # sent together afterwards
+    base_nonce = w3.eth.get_transaction_count(ACCOUNT_ADDRESS, "pending")
+    gas_price = w3.eth.gas_price
+    pending = []
+    checkpoints = []  # (seq_no, tip_hash_hex) for batch mode
 
-        print(
-            f"[{seq_no:02d}/{chunks}] lines={upto:>6}  "
-            f"bytes={len(body):>8}  VersionId={version_id} tipHash={tip_hash_hex}"
-        )
+    rolling = RollingHash()
+    prev_byte_off = 0
+    view = memoryview(data)  # bodies and deltas are views, not copies
+    completed = False
+
+    # Whatever happens to the uploads, the txs signed so far are always sent,
+    # so every version that reached S3 is anchored on-chain
+    try:
+        for seq_no, upto in enumerate(steps, start=1):
+            # Map the cumulative line count to a byte offset into the file
+            byte_off = line_end_offsets[upto - 1] if upto else 0
+
+            # Rolling update w/ only new bytes since last upload
+            new_segment = view[prev_byte_off:byte_off]  # just the delta
+            H = rolling.update(new_segment)
+            tip_hash_hex = "0x" + H.hex()
 
-        prev_upto = upto
+            body = view[:byte_off]
+            # The tip is sha256(log so far), i.e. exactly the body's SHA-256
+            upload_flight_log(s3, bucket, key, body, sha256=H)
+            head = s3.head_object(Bucket=bucket, Key=key)
+            version_id = head.get("VersionId")
 
-        # Send to Ethereum
-        try:
-            emit_checkpoint_to_chain(
-                flight_id=flight_id,
-                seq_no=seq_no,
-                tip_hash_hex=H.hex(),  # or tip_hash_hex (with "0x")
+            print(
+                f"[{seq_no:02d}/{chunks}] lines={upto:>6}  "
+                f"bytes={len(body):>8}  VersionId={version_id} tipHash={tip_hash_hex}"
             )
-        except Exception as e:
-            print(f"⚠️ Failed to emit checkpoint on-chain: {e}")
 
-    try:
-        print(f"Closing flight {flight_id} on-chain...")
-        res = close_flight_on_chain(flight_id)
-        print(f"  → tx={res['transaction_hash']} status={res['status']}")
-    except Exception as e:
-        print(f"⚠️ Failed to close flight on-chain: {e}")
+            prev_byte_off = byte_off
+
+            if batch_checkpoints:
+                checkpoints.append((seq_no, H.hex()))
+                continue
+
+            # Send to Ethereum
+            try:
+                emit_checkpoint_to_chain(
+                    flight_id=flight_id,
+                    seq_no=seq_no,
+                    tip_hash_hex=H.hex(),  # or tip_hash_hex (with "0x")
+                    pending=pending,
+                    base_nonce=base_nonce,
+                    gas_price=gas_price,
+                )
+            except Exception as e:
+                print(f"⚠️ Failed to emit checkpoint on-chain: {e}")
+
+        completed = True
+    finally:
+        if not completed:
+            print("⚠️ Upload loop aborted; anchoring the versions uploaded so far.")
+
+        if batch_checkpoints and checkpoints:
+            try:
+                emit_checkpoints_batch_to_chain(
+                    flight_id=flight_id,
+                    checkpoints=checkpoints,
+                    pending=pending,
+                    base_nonce=base_nonce,
+                    gas_price=gas_price,
+                )
+            except Exception as e:
+                print(f"⚠️ Failed to emit checkpoint batch on-chain: {e}")
+
+        # Only a fully uploaded flight is closed; an aborted one stays open
+        if completed:
+            try:
+                print(f"Closing flight {flight_id} on-chain...")
+                signed_tx = sign_close_flight_tx(
+                    flight_id,
+                    nonce=base_nonce + len(pending),
+                    gas_price=gas_price,
+                )
+                pending.append(("closeFlight", signed_tx))
+                print(f"  → tx={signed_tx.hash.hex()} (signed)")
+            except Exception as e:
+                print(f"⚠️ Failed to close flight on-chain: {e}")
+
+        sent_count = send_and_confirm(pending)
+
+    if pending and not sent_count:
+        print("-" * 60)
+        print("❌ The node accepted none of the signed txs; the uploaded versions are not anchored on-chain.")
+        sys.exit(1)
+
     print("-" * 60)
     print("Done. You should now see multiple versions via:")
     print(f"  GET /api/storage/versions/{flight_id}")
@@ -179,6 +335,12 @@ def main():
         default=None,
         help="Override S3 bucket (defaults to settings.AWS_S3_BUCKET)."
     )
+    parser.add_argument(
+        "--batch-checkpoints",
+        action="store_true",
+        help="Anchor all checkpoints in one addCheckpointsBatch tx after the uploads "
+             "(requires a registry deployment that exposes it)."
+    )
 
     args = parser.parse_args()
     source_file = Path(args.source).resolve()
@@ -191,6 +353,7 @@ def main():
         flight_id=args.flight_id,
         chunks=args.chunks,
         bucket=args.bucket,
+        batch_checkpoints=args.batch_checkpoints,
     )
 
 
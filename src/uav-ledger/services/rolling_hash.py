@@ -0,0 +1,47 @@
+# services/rolling_hash.py
+
+import hashlib
+
+
+class RollingHash:
+    """
+    Tip hash over a cumulative flight log.
+
+    Only the bytes appended since the previous upload are fed in, into a
+    single SHA-256 state that persists across uploads. The tip after
+    upload k is therefore sha256(log[:end_of_upload_k]).
+
+    Shared by logUploadSim.py (write side) and verify_flight.py
+    (verification side) so both compute the exact same sequence.
+    """
+
+    def __init__(self):
+        self._hasher = hashlib.sha256()
+
+    def update(self, new_bytes) -> bytes:
+        """
+        Absorb the delta for this upload and return the 32-byte tip digest.
+        """
+        self._hasher.update(new_bytes)
+        return self._hasher.copy().digest()
+
+
+class LegacyRollingHash:
+    """
+    Chained digest used by flights anchored before RollingHash:
+    H_k = sha256(H_{k-1} || delta_k), starting from 32 zero bytes.
+
+    Kept only so those flights can still be verified; new uploads use
+    RollingHash.
+    """
+
+    def __init__(self):
+        self._tip = b"\x00" * 32
+
+    def update(self, new_bytes) -> bytes:
+        self._tip = hashlib.sha256(self._tip + bytes(new_bytes)).digest()
+        return self._tip
+
+
+def make_rolling_hash(legacy: bool = False):
+    return LegacyRollingHash() if legacy else RollingHash()
@@ -1,8 +1,13 @@
 # services/uav_registry_client.py
 
-from typing import Dict, Any
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 
+from eth_abi import decode, encode
 from web3 import Web3
+from web3.exceptions import TimeExhausted
 
 from .eth_client import (
     w3,
@@ -38,6 +43,17 @@ UAV_FLIGHT_REGISTRY_ABI = [
         "stateMutability": "nonpayable",
         "type": "function",
     },
+    {
+        "inputs": [
+            {"internalType": "bytes32", "name": "flightId", "type": "bytes32"},
+            {"internalType": "uint256[]", "name": "versionIds", "type": "uint256[]"},
+            {"internalType": "bytes32[]", "name": "hashes", "type": "bytes32[]"},
+        ],
+        "name": "addCheckpointsBatch",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function",
+    },
     {
         "inputs": [
             {"internalType": "bytes32", "name": "flightId", "type": "bytes32"}
@@ -91,18 +107,75 @@ UAV_FLIGHT_REGISTRY_ABI = [
 ]
 
 
+# =========================
+#  Multicall3 ABI
+# =========================
+
+# Multicall3 is deployed at the same address on mainnet, Sepolia and most L2s.
+MULTICALL3_ADDRESS = Web3.to_checksum_address(
+    "0xcA11bde05977b3631167028862bE2a173976CA11"
+)
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]",
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]",
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function",
+    },
+]
+
+# getCheckpoint reads per aggregate3 eth_call; keeps each call well under
+# typical RPC gas / response-size caps on long flights
+MULTICALL_BATCH_SIZE = 500
+
+
+# Built once at import; web3 walks the whole ABI on every contract() call.
+_CONTRACT = w3.eth.contract(address=CONTRACT_ADDRESS, abi=UAV_FLIGHT_REGISTRY_ABI)
+
+# addCheckpoint is sent once per upload, so its calldata is encoded directly
+# from the precomputed selector instead of going through ContractFunction.
+_ADD_CHECKPOINT_SELECTOR = Web3.keccak(text="addCheckpoint(bytes32,uint256,bytes32)")[:4]
+
+_MULTICALL = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+_GET_CHECKPOINT_SELECTOR = Web3.keccak(text="getCheckpoint(bytes32,uint256)")[:4]
+
+
 def get_uav_contract():
     """
-    Build a Web3 contract object for UavFlightRegistry using the
+    Return the Web3 contract object for UavFlightRegistry, bound to the
     same CONTRACT_ADDRESS and RPC connection from eth_client.py.
     """
-    return w3.eth.contract(address=CONTRACT_ADDRESS, abi=UAV_FLIGHT_REGISTRY_ABI)
+    return _CONTRACT
 
 
 # =========================
 #  Helper functions
 # =========================
 
+@functools.lru_cache(maxsize=1024)
 def flight_id_to_bytes32(flight_id: str) -> bytes:
     """
     Convert a human-readable flight_id string into bytes32.
@@ -110,6 +183,8 @@ def flight_id_to_bytes32(flight_id: str) -> bytes:
     We reuse keccak hash so:
       - input: "flight-2025-11-29-uav01"
       - result: 32-byte hash used as key in the contract.
+
+    Memoized: every on-chain call for a flight needs the same key.
     """
     return mission_id_to_bytes32(flight_id)
 
@@ -118,31 +193,93 @@ def normalize_hash(hash_hex: str) -> bytes:
     """
     Normalize a hex string into a bytes32 value.
     Accepts forms like:
-      - "0xabc123..."
+      - "0xabc123..." / "0XABC123..."
       - "abc123..."
+    bytes.fromhex is case-insensitive, so no lowercased copy is made.
     """
-    h = hash_hex.strip().lower()
-    if h.startswith("0x"):
+    h = hash_hex
+    if len(h) == 66 and h[0] == "0" and (h[1] == "x" or h[1] == "X"):
         h = h[2:]
-    if len(h) != 64:
+    elif len(h) != 64:
+        raise ValueError("Hash must be 32 bytes (64 hex chars)")
+    out = bytes.fromhex(h)
+    if len(out) != 32:
+        # fromhex skips whitespace, so 64 chars can still decode short
         raise ValueError("Hash must be 32 bytes (64 hex chars)")
-    return bytes.fromhex(h)
+    return out
+
+
+# =========================
+#  Connection check
+# =========================
+
+# w3.is_connected() is an RPC round-trip of its own; a successful probe is
+# trusted for this many seconds instead of re-probing on every call.
+CONNECTION_CHECK_TTL = 5.0
+_connected_at = None  # time.monotonic() of the last successful probe
+
+
+def _require_connection(fn):
+    """
+    Raise RuntimeError before calling `fn` if the Ethereum node is unreachable.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _connected_at
+        now = time.monotonic()
+        if _connected_at is None or now - _connected_at > CONNECTION_CHECK_TTL:
+            if not w3.is_connected():
+                _connected_at = None
+                raise RuntimeError("Not connected to Ethereum node")
+            _connected_at = now
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+# =========================
+#  addCheckpoint fast path
+# =========================
+
+# Fields that are the same for every addCheckpoint tx, bound once at import.
+_ADD_CHECKPOINT_TX_BASE = {"to": CONTRACT_ADDRESS, "value": 0, "chainId": CHAIN_ID}
+
+def make_add_checkpoint_tx(
+    flight_key: bytes,
+    version_id: int,
+    hash_bytes32: bytes,
+    nonce: int,
+    gas_price: int,
+    gas: int,
+) -> Dict[str, Any]:
+    """
+    Build an unsigned addCheckpoint(flightId, versionId, hash) tx dict
+    straight from the precomputed selector, without going through web3's
+    ContractFunction / build_transaction.
+    """
+    tx = dict(_ADD_CHECKPOINT_TX_BASE)
+    tx["data"] = _ADD_CHECKPOINT_SELECTOR + encode(
+        ["bytes32", "uint256", "bytes32"], [flight_key, version_id, hash_bytes32]
+    )
+    tx["nonce"] = nonce
+    tx["gasPrice"] = gas_price
+    tx["gas"] = gas
+
+    return tx
 
 
 # =========================
 #  Write operations
 # =========================
 
+@_require_connection
 def register_flight_on_chain(flight_id: str) -> Dict[str, Any]:
     """
     Calls registerFlight(flightId) on UavFlightRegistry.
 
     Off-chain flight_id (string) -> bytes32 key via keccak.
     """
-    if not w3.is_connected():
-        raise RuntimeError("Not connected to Ethereum node")
-
-    contract = get_uav_contract()
+    contract = _CONTRACT
     flight_key = flight_id_to_bytes32(flight_id)
 
     nonce = w3.eth.get_transaction_count(ACCOUNT_ADDRESS)
@@ -169,6 +306,7 @@ def register_flight_on_chain(flight_id: str) -> Dict[str, Any]:
     }
 
 
+@_require_connection
 def add_checkpoint_on_chain(
     flight_id: str, version_id: int, hash_hex: str
 ) -> Dict[str, Any]:
@@ -179,19 +317,15 @@ def add_checkpoint_on_chain(
     - version_id: 1, 2, 3, ... (for each checkpoint)
     - hash_hex: SHA-256 hash of the log version as hex string
     """
-    if not w3.is_connected():
-        raise RuntimeError("Not connected to Ethereum node")
-
     if version_id <= 0:
         raise ValueError("version_id must be > 0")
 
-    contract = get_uav_contract()
     flight_key = flight_id_to_bytes32(flight_id)
     hash_bytes32 = normalize_hash(hash_hex)  # already 32-byte value
 
     nonce = w3.eth.get_transaction_count(ACCOUNT_ADDRESS)
 
-    tx = contract.functions.addCheckpoint(
+    tx = _CONTRACT.functions.addCheckpoint(
         flight_key, version_id, hash_bytes32
     ).build_transaction(
         {
@@ -217,14 +351,12 @@ def add_checkpoint_on_chain(
     }
 
 
+@_require_connection
 def close_flight_on_chain(flight_id: str) -> Dict[str, Any]:
     """
     Calls closeFlight(flightId) to finalize a flight.
     """
-    if not w3.is_connected():
-        raise RuntimeError("Not connected to Ethereum node")
-
-    contract = get_uav_contract()
+    contract = _CONTRACT
     flight_key = flight_id_to_bytes32(flight_id)
 
     nonce = w3.eth.get_transaction_count(ACCOUNT_ADDRESS)
@@ -251,31 +383,229 @@ def close_flight_on_chain(flight_id: str) -> Dict[str, Any]:
     }
 
 
+# =========================
+#  Pipelined write operations
+# =========================
+
+# These are signed up front and sent as a group without waiting for receipts,
+# so a flight's txs are usually in the mempool together (addCheckpoint right behind registerFlight).
+# eth_estimateGas would simulate against state where the earlier txs are not
+# mined yet and revert, so they carry a fixed gas limit instead.
+PIPELINED_TX_GAS = 500000
+# Extra gas per checkpoint in an addCheckpointsBatch tx
+BATCH_CHECKPOINT_GAS = 100000
+# Gas ceiling for one addCheckpointsBatch tx: half a 30M block, and under the
+# 2**24 per-tx cap some networks enforce, so a batch can always be mined
+MAX_BATCH_TX_GAS = 15000000
+MAX_CHECKPOINTS_PER_BATCH = (MAX_BATCH_TX_GAS - PIPELINED_TX_GAS) // BATCH_CHECKPOINT_GAS
+# eth_sendRawTransaction calls per JSON-RPC batch; hosted RPCs commonly
+# reject larger batches outright
+SEND_BATCH_SIZE = 20
+
+
+def _sign(tx: Dict[str, Any]):
+    return w3.eth.account.sign_transaction(tx, private_key=ETH_PRIVATE_KEY)
+
+
+def _sign_pipelined(fn, nonce: int, gas_price: int, gas: int = PIPELINED_TX_GAS):
+    """
+    Sign a contract call with an explicit nonce, gas limit and gas price.
+    Every field is given up front, so building it needs no RPC.
+    """
+    tx = fn.build_transaction(
+        {
+            "from": ACCOUNT_ADDRESS,
+            "nonce": nonce,
+            "chainId": CHAIN_ID,
+            "gas": gas,
+            "gasPrice": gas_price,
+        }
+    )
+    return _sign(tx)
+
+
+def sign_register_flight_tx(flight_id: str, nonce: int, gas_price: int):
+    """
+    Sign registerFlight(flightId) with the given nonce, without sending it.
+    Returns the SignedTransaction (.raw_transaction, .hash).
+    """
+    contract = _CONTRACT
+    flight_key = flight_id_to_bytes32(flight_id)
+    return _sign_pipelined(
+        contract.functions.registerFlight(flight_key), nonce, gas_price
+    )
+
+
+def sign_checkpoint_tx(
+    flight_id: str, seq_no: int, hash_hex: str, nonce: int, gas_price: int
+):
+    """
+    Sign addCheckpoint(flightId, seq_no, hash) with the given nonce,
+    without sending it.
+
+    The caller owns nonce sequencing: fetch the account nonce once and
+    pass base_nonce + i for each tx so they are mined in submission order.
+    """
+    if seq_no <= 0:
+        raise ValueError("seq_no must be > 0")
+
+    flight_key = flight_id_to_bytes32(flight_id)
+    hash_bytes32 = normalize_hash(hash_hex)
+
+    tx = make_add_checkpoint_tx(
+        flight_key, seq_no, hash_bytes32, nonce, gas_price, gas=PIPELINED_TX_GAS
+    )
+    return _sign(tx)
+
+
+def _batch_args(versions_and_hashes: List[Tuple[int, str]]):
+    """
+    Split [(version_id, hash_hex), ...] into the two parallel arrays
+    expected by addCheckpointsBatch.
+    """
+    if not versions_and_hashes:
+        raise ValueError("versions_and_hashes must not be empty")
+
+    version_ids = []
+    hashes = []
+    for version_id, hash_hex in versions_and_hashes:
+        if version_id <= 0:
+            raise ValueError("version_id must be > 0")
+        version_ids.append(version_id)
+        hashes.append(normalize_hash(hash_hex))
+    return version_ids, hashes
+
+
+def sign_checkpoints_batch_tx(
+    flight_id: str,
+    versions_and_hashes: List[Tuple[int, str]],
+    nonce: int,
+    gas_price: int,
+):
+    """
+    Sign addCheckpointsBatch(flightId, versionIds, hashes) with the given
+    nonce, without sending it. One tx anchors every checkpoint in the batch.
+
+    At most MAX_CHECKPOINTS_PER_BATCH checkpoints fit under the gas ceiling;
+    split longer flights across several batches.
+    """
+    if len(versions_and_hashes) > MAX_CHECKPOINTS_PER_BATCH:
+        raise ValueError(
+            f"batch of {len(versions_and_hashes)} checkpoints exceeds "
+            f"MAX_CHECKPOINTS_PER_BATCH={MAX_CHECKPOINTS_PER_BATCH}"
+        )
+
+    contract = _CONTRACT
+    flight_key = flight_id_to_bytes32(flight_id)
+    version_ids, hashes = _batch_args(versions_and_hashes)
+    return _sign_pipelined(
+        contract.functions.addCheckpointsBatch(flight_key, version_ids, hashes),
+        nonce,
+        gas_price,
+        gas=PIPELINED_TX_GAS + BATCH_CHECKPOINT_GAS * len(version_ids),
+    )
+
+
+def sign_close_flight_tx(flight_id: str, nonce: int, gas_price: int):
+    """
+    Sign closeFlight(flightId) with the given nonce, without sending it.
+    """
+    contract = _CONTRACT
+    flight_key = flight_id_to_bytes32(flight_id)
+    return _sign_pipelined(
+        contract.functions.closeFlight(flight_key), nonce, gas_price
+    )
+
+
+@_require_connection
+def send_raw_transactions_batch(
+    signed_txs: List[Any],
+) -> List[Tuple[Any, Optional[str]]]:
+    """
+    Send already-signed txs as JSON-RPC batches of up to SEND_BATCH_SIZE
+    eth_sendRawTransaction calls (one HTTP request per batch).
+
+    Returns one (tx_hash, error) per tx, in order: error is None if the
+    node accepted the tx, else the node's error message. A rejected entry
+    or batch (e.g. nonce too low, batch too large) does not hide the ones
+    that did go out.
+    """
+    results = []
+    for start in range(0, len(signed_txs), SEND_BATCH_SIZE):
+        chunk = signed_txs[start:start + SEND_BATCH_SIZE]
+
+        # Go through the provider directly: w3.batch_requests() raises on the
+        # first failed entry and drops the results of the others
+        try:
+            responses = w3.provider.make_batch_request(
+                [
+                    ("eth_sendRawTransaction", [Web3.to_hex(signed_tx.raw_transaction)])
+                    for signed_tx in chunk
+                ]
+            )
+        except Exception as e:
+            results.extend((signed_tx.hash, f"batch request failed: {e}") for signed_tx in chunk)
+            continue
+
+        if not isinstance(responses, list):
+            # the node rejected the batch as a whole; nothing in it was sent
+            error = f"batch rejected: {responses.get('error')}"
+            results.extend((signed_tx.hash, error) for signed_tx in chunk)
+            continue
+
+        for i, signed_tx in enumerate(chunk):
+            if i >= len(responses):
+                # the node answered fewer entries than were sent
+                results.append((signed_tx.hash, "no response from node"))
+                continue
+            error = responses[i].get("error")
+            if error is not None:
+                error = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+            results.append((signed_tx.hash, error))
+    return results
+
+
+def _wait_for_receipt(tx_hash: Any) -> Optional[Any]:
+    try:
+        return w3.eth.wait_for_transaction_receipt(tx_hash)
+    except TimeExhausted:
+        return None
+
+
+def wait_all(tx_hashes: List[Any], max_workers: int = 16) -> List[Optional[Any]]:
+    """
+    Wait for every tx hash to be mined, polling receipts concurrently.
+    Receipts are returned in the same order as tx_hashes; a tx that is not
+    mined before the timeout gets None instead of discarding the others.
+    """
+    if not tx_hashes:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tx_hashes))) as ex:
+        return list(ex.map(_wait_for_receipt, tx_hashes))
+
+
 # =========================
 #  Read operations
 # =========================
 
+@_require_connection
 def get_checkpoint_count_from_chain(flight_id: str) -> int:
     """
     Calls getCheckpointCount(flightId) and returns how many checkpoints exist.
     """
-    if not w3.is_connected():
-        raise RuntimeError("Not connected to Ethereum node")
-
-    contract = get_uav_contract()
+    contract = _CONTRACT
     flight_key = flight_id_to_bytes32(flight_id)
 
     return contract.functions.getCheckpointCount(flight_key).call()
 
 
+@_require_connection
 def get_checkpoint_from_chain(flight_id: str, index: int) -> Dict[str, Any]:
     """
     Calls getCheckpoint(flightId, index) and returns structured data.
     """
-    if not w3.is_connected():
-        raise RuntimeError("Not connected to Ethereum node")
-
-    contract = get_uav_contract()
+    contract = _CONTRACT
     flight_key = flight_id_to_bytes32(flight_id)
 
     version_id, hash_bytes32, timestamp = contract.functions.getCheckpoint(
@@ -292,6 +622,51 @@ def get_checkpoint_from_chain(flight_id: str, index: int) -> Dict[str, Any]:
     }
 
 
+@_require_connection
+def get_checkpoints_from_chain(flight_id: str) -> List[Dict[str, Any]]:
+    """
+    Read every checkpoint for a flight, in index order.
+
+    Same result shape as get_checkpoint_from_chain, but the getCheckpoint
+    reads are bundled into Multicall3 aggregate3 calls, so a flight costs
+    one eth_call for the count plus one per MULTICALL_BATCH_SIZE checkpoints
+    instead of one per checkpoint.
+    """
+    flight_key = flight_id_to_bytes32(flight_id)
+    count = _CONTRACT.functions.getCheckpointCount(flight_key).call()
+
+    checkpoints = []
+    for start in range(0, count, MULTICALL_BATCH_SIZE):
+        indices = range(start, min(start + MULTICALL_BATCH_SIZE, count))
+        calls = [
+            (
+                CONTRACT_ADDRESS,
+                False,
+                _GET_CHECKPOINT_SELECTOR
+                + encode(["bytes32", "uint256"], [flight_key, index]),
+            )
+            for index in indices
+        ]
+        results = _MULTICALL.functions.aggregate3(calls).call()
+
+        for index, (_success, return_data) in zip(indices, results):
+            version_id, hash_bytes32, timestamp = decode(
+                ["uint256", "bytes32", "uint256"], return_data
+            )
+            checkpoints.append(
+                {
+                    "flight_id": flight_id,
+                    "flight_key": flight_key.hex(),
+                    "index": index,
+                    "version_id": int(version_id),
+                    "hash_hex": Web3.to_hex(hash_bytes32),
+                    "timestamp": int(timestamp),
+                }
+            )
+
+    return checkpoints
+
+
 # =========================
 #  Simple smoke test
 # =========================
@@ -1,28 +1,47 @@
 # services/verify_flight.py
 
-from typing import List, Dict, Any, Tuple
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 
-import hashlib
 from django.conf import settings
+from django.core.cache import cache
 
 from storage.s3_client import s3_client, flight_key
-from services.uav_registry_client import (
-    get_checkpoint_count_from_chain,
-    get_checkpoint_from_chain,
-)
+from services.uav_registry_client import get_checkpoints_from_chain
+from services.rolling_hash import make_rolling_hash
 
+# Concurrent GETs when downloading a flight's versions
+S3_DOWNLOAD_WORKERS = 16
 
-def rolling_seed() -> bytes:
-    return b"\x00" * 32
+# Background verification: jobs run off the request thread; their state lives
+# in Django's cache so the page and the status endpoint can look it up.
+VERIFY_WORKERS = 4
+VERIFY_JOB_TTL = 600  # seconds a finished result stays available
+# A job still pending this long after it was queued or started is treated as
+# lost (e.g. the worker process that owned it was recycled)
+VERIFY_JOB_STALE_AFTER = 120
+# Jobs queued or running in this process before new ones are refused
+VERIFY_MAX_QUEUED = 2 * VERIFY_WORKERS
+_verify_executor = ThreadPoolExecutor(max_workers=VERIFY_WORKERS)
+_verify_queued = 0
+_verify_queued_lock = threading.Lock()
 
 
-def rolling_update(H_prev: bytes, new_bytes: bytes) -> bytes:
-    return hashlib.sha256(H_prev + new_bytes).digest()
+class VerifyQueueFull(RuntimeError):
+    """Raised by verify_flight_async when too many jobs are already queued."""
 
 
-def fetch_s3_versions_with_bodies(flight_id: str) -> List[Dict[str, Any]]:
+def fetch_s3_version_deltas(flight_id: str) -> List[Dict[str, Any]]:
     """
-    Fetch all S3 versions for this flight *and* download their bodies.
+    Fetch all S3 versions for this flight and download only the bytes each
+    version appended to the previous one.
+
+    Versions are cumulative, so version k's new bytes are the range
+    [size_{k-1}, size_k). Sizes come from list_object_versions, so each
+    version costs one ranged GET instead of a download of the whole prefix.
 
     Returns a list of dicts (ascending by time):
       {
@@ -30,7 +49,8 @@ def fetch_s3_versions_with_bodies(flight_id: str) -> List[Dict[str, Any]]:
         "version_id": "...",
         "last_modified": datetime,
         "size": int,
-        "body": bytes,
+        "delta": bytes,
+        "shrank": bool,
       }
     """
     s3 = s3_client()
@@ -48,47 +68,62 @@ def fetch_s3_versions_with_bodies(flight_id: str) -> List[Dict[str, Any]]:
     # sort oldest -> newest for recomputing rolling hash
     versions.sort(key=lambda v: v["LastModified"])
 
+    prev_sizes = [0] + [v["Size"] for v in versions[:-1]]
+
+    def download(v, prev_size):
+        size = v["Size"]
+        if size < prev_size:
+            # If body shrank, that's already suspicious; treat the whole
+            # body as "new" and flag it
+            obj = s3.get_object(Bucket=bucket, Key=key, VersionId=v["VersionId"])
+            return obj["Body"].read(), True
+        if size == prev_size:
+            # nothing appended; an empty range would be rejected by S3
+            return b"", False
+        obj = s3.get_object(
+            Bucket=bucket,
+            Key=key,
+            VersionId=v["VersionId"],
+            Range=f"bytes={prev_size}-{size - 1}",
+        )
+        return obj["Body"].read(), False
+
+    # boto3 clients are thread-safe; map() keeps results in version order
+    with ThreadPoolExecutor(max_workers=S3_DOWNLOAD_WORKERS) as ex:
+        deltas = list(ex.map(download, versions, prev_sizes))
+
     out = []
-    for idx, v in enumerate(versions, start=1):
-        version_id = v["VersionId"]
-        obj = s3.get_object(Bucket=bucket, Key=key, VersionId=version_id)
-        body = obj["Body"].read()
+    for idx, (v, (delta, shrank)) in enumerate(zip(versions, deltas), start=1):
         out.append(
             {
                 "seq_no": idx,
-                "version_id": version_id,
+                "version_id": v["VersionId"],
                 "last_modified": v["LastModified"],
-                "size": len(body),
-                "body": body,
+                "size": v["Size"],
+                "delta": delta,
+                "shrank": shrank,
             }
         )
 
     return out
 
 
-def recompute_rolling_hashes(s3_versions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def recompute_rolling_hashes(
+    s3_versions: List[Dict[str, Any]], legacy_hash: bool = False
+) -> List[Dict[str, Any]]:
     """
-    Given S3 versions (oldest -> newest, each with 'body'), recompute the
-    rolling tip hash sequence using the same scheme as logUploadSim.py.
+    Given S3 versions (oldest -> newest, each with its 'delta'), recompute
+    the rolling tip hash sequence using the same scheme as logUploadSim.py.
 
     We assume each version is the cumulative log up to that point.
+    legacy_hash=True recomputes the old chained digests instead, for flights
+    anchored before the switch to a single streamed SHA-256.
     """
-    H = rolling_seed()
-    prev_body = b""
+    rolling = make_rolling_hash(legacy=legacy_hash)
     results = []
 
     for v in s3_versions:
-        body = v["body"]
-
-        # If body shrank, that's already suspicious; still handle gracefully
-        if len(body) < len(prev_body):
-            new_segment = body  # everything is "new", but we flag it below
-            shrank = True
-        else:
-            new_segment = body[len(prev_body):]
-            shrank = False
-
-        H = rolling_update(H, new_segment)
+        H = rolling.update(v["delta"])
         tip_hash_hex = "0x" + H.hex()
 
         results.append(
@@ -97,12 +132,10 @@ def recompute_rolling_hashes(s3_versions: List[Dict[str, Any]]) -> List[Dict[str
                 "version_id": v["version_id"],
                 "size": v["size"],
                 "computed_hash": tip_hash_hex,
-                "shrank": shrank,
+                "shrank": v["shrank"],
             }
         )
 
-        prev_body = body
-
     return results
 
 
@@ -110,15 +143,13 @@ def fetch_onchain_checkpoints(flight_id: str) -> List[Dict[str, Any]]:
     """
     Pull all checkpoints for this flight from the registry contract.
     """
-    count = get_checkpoint_count_from_chain(flight_id)
     checkpoints = []
-    for i in range(count):
-        cp = get_checkpoint_from_chain(flight_id, i)
+    for cp in get_checkpoints_from_chain(flight_id):
         # normalize hash to lowercase 0x-prefixed string
         h = cp["hash_hex"]
         checkpoints.append(
             {
-                "seq_no": i + 1,
+                "seq_no": cp["index"] + 1,
                 "hash_hex": h.lower(),
                 "raw": cp,
             }
@@ -128,6 +159,7 @@ def fetch_onchain_checkpoints(flight_id: str) -> List[Dict[str, Any]]:
 
 def verify_flight_against_chain(
     flight_id: str,
+    legacy_hash: bool = False,
 ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
     """
     Main entry point used by the Django view.
@@ -167,7 +199,7 @@ def verify_flight_against_chain(
     }
 
     try:
-        s3_versions = fetch_s3_versions_with_bodies(flight_id)
+        s3_versions = fetch_s3_version_deltas(flight_id)
     except Exception as e:
         summary["error"] = f"Failed to read S3 versions: {e}"
         return summary, []
@@ -176,7 +208,7 @@ def verify_flight_against_chain(
         summary["error"] = "No S3 versions found for this flight."
         return summary, []
 
-    computed = recompute_rolling_hashes(s3_versions)
+    computed = recompute_rolling_hashes(s3_versions, legacy_hash=legacy_hash)
     try:
         checkpoints = fetch_onchain_checkpoints(flight_id)
     except Exception as e:
@@ -240,3 +272,109 @@ def verify_flight_against_chain(
     summary["first_bad_seq"] = first_bad_seq
 
     return summary, rows
+
+
+# =========================
+#  Background verification
+# =========================
+
+def _verify_job_key(job_id: str) -> str:
+    return f"verify-job:{job_id}"
+
+
+def _verify_inflight_key(flight_id: str, legacy_hash: bool) -> str:
+    return f"verify-inflight:{flight_id}:{int(legacy_hash)}"
+
+
+def _set_pending(job_id: str, flight_id: str) -> None:
+    cache.set(
+        _verify_job_key(job_id),
+        {
+            "flight_id": flight_id,
+            "state": "pending",
+            "summary": None,
+            "rows": [],
+            "updated_at": time.time(),
+        },
+        VERIFY_JOB_TTL,
+    )
+
+
+def _run_verify_job(job_id: str, flight_id: str, legacy_hash: bool) -> None:
+    global _verify_queued
+
+    try:
+        # Restart the staleness clock: time spent queued is not time lost
+        _set_pending(job_id, flight_id)
+        try:
+            summary, rows = verify_flight_against_chain(flight_id, legacy_hash=legacy_hash)
+        except Exception as e:
+            summary, rows = {"flight_id": flight_id, "error": f"Verification crashed: {e}"}, []
+
+        cache.set(
+            _verify_job_key(job_id),
+            {"flight_id": flight_id, "state": "done", "summary": summary, "rows": rows},
+            VERIFY_JOB_TTL,
+        )
+        cache.delete(_verify_inflight_key(flight_id, legacy_hash))
+    finally:
+        with _verify_queued_lock:
+            _verify_queued -= 1
+
+
+def verify_flight_async(flight_id: str, legacy_hash: bool = False) -> str:
+    """
+    Queue verify_flight_against_chain on the background pool and return a
+    job_id right away; poll it with get_verify_job.
+
+    A job already pending for the same (flight_id, legacy_hash) is reused.
+    Raises VerifyQueueFull once VERIFY_MAX_QUEUED jobs are queued or running.
+    """
+    global _verify_queued
+
+    inflight_key = _verify_inflight_key(flight_id, legacy_hash)
+    job_id = cache.get(inflight_key)
+    if job_id:
+        job = get_verify_job(job_id)
+        if job is not None and job["state"] == "pending":
+            return job_id
+
+    with _verify_queued_lock:
+        if _verify_queued >= VERIFY_MAX_QUEUED:
+            raise VerifyQueueFull("Too many verifications in progress; try again shortly.")
+        _verify_queued += 1
+
+    job_id = uuid.uuid4().hex
+    _set_pending(job_id, flight_id)
+    cache.set(inflight_key, job_id, VERIFY_JOB_TTL)
+    try:
+        _verify_executor.submit(_run_verify_job, job_id, flight_id, legacy_hash)
+    except Exception:
+        with _verify_queued_lock:
+            _verify_queued -= 1
+        raise
+    return job_id
+
+
+def get_verify_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns {"flight_id", "state": "pending" | "done", "summary", "rows"},
+    or None if the job is unknown or has expired. A pending job that has not
+    moved for VERIFY_JOB_STALE_AFTER seconds is reported as done with an error.
+    """
+    job = cache.get(_verify_job_key(job_id))
+    if (
+        job is not None
+        and job["state"] == "pending"
+        and time.time() - job.get("updated_at", 0) > VERIFY_JOB_STALE_AFTER
+    ):
+        job = {
+            "flight_id": job["flight_id"],
+            "state": "done",
+            "summary": {
+                "flight_id": job["flight_id"],
+                "error": "Verification did not finish (the worker may have restarted); try again.",
+            },
+            "rows": [],
+        }
+    return job
@@ -1,8 +1,45 @@
+import base64
+import functools
+import io
+from typing import Optional
+
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from django.conf import settings
 
+# Large version bodies go out as multipart uploads with parts sent in parallel.
+# Versions themselves are still written one after another so S3 keeps them in order.
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=64 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True,
+)
+
+# Room for the verifier's parallel GETs and the transfer manager's part uploads
+# without threads queueing on the HTTP connection pool.
+S3_MAX_POOL_CONNECTIONS = 64
+
+# Checksums are only computed when asked for: upload_flight_log either passes
+# the SHA-256 we already have, or names CRC32 explicitly for multipart uploads,
+# so botocore never adds a second default checksum pass over the body.
+S3_CONFIG = Config(
+    max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+    retries={"max_attempts": 10, "mode": "adaptive"},
+    tcp_keepalive=True,
+    s3={"addressing_style": "virtual", "payload_signing_enabled": False},
+    request_checksum_calculation="when_required",
+)
+
+# One client per process: building it parses the session/config every time,
+# and boto3 clients are safe to share across threads.
+@functools.lru_cache(maxsize=1)
 def s3_client():
-    kwargs = {"region_name": settings.AWS_REGION}
+    kwargs = {
+        "region_name": settings.AWS_REGION,
+        "config": S3_CONFIG,
+    }
     if getattr(settings, "AWS_ACCESS_KEY_ID", None) and getattr(settings, "AWS_SECRET_ACCESS_KEY", None):
         kwargs.update({
             "aws_access_key_id": settings.AWS_ACCESS_KEY_ID,
@@ -13,4 +50,72 @@ def s3_client():
 def flight_key(flight_id: str) -> str:
     # e.g., flights/flight-001/flight.log
     prefix = settings.AWS_S3_FLIGHT_PREFIX.strip("/")
-    return f"{prefix}/{flight_id}/flight.log"
\ No newline at end of file
+    return f"{prefix}/{flight_id}/flight.log"
+
+class MemoryviewReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over a bytes-like buffer.
+    Lets a slice of the source log be uploaded without first copying it
+    into a new bytes object; data is only copied as botocore reads it.
+    """
+
+    def __init__(self, buf):
+        self._view = memoryview(buf)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError("negative seek position")
+        self._pos = pos
+        return pos
+
+    def tell(self):
+        return self._pos
+
+def upload_flight_log(s3, bucket: str, key: str, body, sha256: Optional[bytes] = None) -> None:
+    # sha256: digest of the whole body, if the caller already has it. Single-part
+    # uploads send it as ChecksumSHA256 so S3 verifies the bytes server-side.
+    # Multipart uploads only take per-part checksums, so there it is unused and
+    # each part carries a CRC32 instead.
+    if sha256 is not None and len(body) < TRANSFER_CONFIG.multipart_threshold:
+        s3.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=MemoryviewReader(body),
+            ContentType="text/plain; charset=utf-8",
+            ChecksumSHA256=base64.b64encode(sha256).decode(),
+        )
+        return
+
+    s3.upload_fileobj(
+        MemoryviewReader(body),
+        bucket,
+        key,
+        ExtraArgs={
+            "ContentType": "text/plain; charset=utf-8",
+            "ChecksumAlgorithm": "CRC32",
+        },
+        Config=TRANSFER_CONFIG,
+    )
@@ -1,9 +1,11 @@
 from datetime import datetime
 
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.urls import reverse
 
 from .utils import list_flight_ids, list_versions
-from services.verify_flight import verify_flight_against_chain
+from services.verify_flight import verify_flight_async, get_verify_job, VerifyQueueFull
 
 
 def flights_page(request):
@@ -12,6 +14,22 @@ def flights_page(request):
 
 
 def flight_versions_page(request, flight_id: str):
+    legacy_hash = request.GET.get("legacy_hash") == "1"
+
+    # Verification runs in the background; hand back a job to poll instead of
+    # holding this request open for S3 + RPC work
+    verify_error = None
+    if request.GET.get("verify") == "1":
+        try:
+            job_id = verify_flight_async(flight_id, legacy_hash=legacy_hash)
+        except VerifyQueueFull as e:
+            verify_error = str(e)
+        else:
+            url = reverse("flight_versions_page", args=[flight_id]) + f"?job={job_id}"
+            if legacy_hash:
+                url += "&legacy_hash=1"
+            return redirect(url)
+
     key, versions = list_versions(flight_id)
 
     version_count = len(versions)
@@ -23,9 +41,19 @@ def flight_versions_page(request, flight_id: str):
     #Verification against chain
     verify_summary = None
     verify_rows = []
+    verify_job_id = None
 
-    if request.GET.get("verify") == "1":
-        verify_summary, verify_rows = verify_flight_against_chain(flight_id)
+    job_id = request.GET.get("job")
+    if verify_error:
+        verify_summary = {"error": verify_error}
+    elif job_id:
+        job = get_verify_job(job_id)
+        if job is None or job["flight_id"] != flight_id:
+            verify_summary = {"error": "Verification job not found or expired."}
+        elif job["state"] == "done":
+            verify_summary, verify_rows = job["summary"], job["rows"]
+        else:
+            verify_job_id = job_id
 
     context = {
         "flight_id": flight_id,
@@ -35,9 +63,18 @@ def flight_versions_page(request, flight_id: str):
         "latest_version_time": latest_version_time,
         "verify_summary": verify_summary,
         "verify_rows": verify_rows,
+        "verify_job_id": verify_job_id,
+        "legacy_hash": legacy_hash,
     }
     return render(request, "versions.html", context)
 
 
+def flight_verify_status(request, flight_id: str, job_id: str):
+    job = get_verify_job(job_id)
+    if job is None or job["flight_id"] != flight_id:
+        return JsonResponse({"state": "unknown"}, status=404)
+    return JsonResponse({"state": job["state"]})
+
+
 def home(request):
     return render(request, "home.html")
@@ -1,10 +1,15 @@
 from django.contrib import admin
 from django.urls import path
-from storage.views import home, flights_page, flight_versions_page
+from storage.views import home, flights_page, flight_versions_page, flight_verify_status
 
 urlpatterns = [
     path("", home, name="home"),
     path("flights/", flights_page, name="flights_page"),
     path("flights/<str:flight_id>/", flight_versions_page, name="flight_versions_page"),
+    path(
+        "flights/<str:flight_id>/verify_status/<str:job_id>/",
+        flight_verify_status,
+        name="flight_verify_status",
+    ),
     path("admin/", admin.site.urls),
 ]